@@ -1,63 +1,163 @@
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, Response, request, send_from_directory, jsonify
+from flask_compress import Compress
+import brotli
 import os
+import hashlib
 import main
 import threading
 import time
-import json
 
 app = Flask(__name__)
+Compress(app)
 
 # Global cache file path
 CACHE_FILE = 'simulation_cache.json'
 
+# Stale-while-revalidate policy for the CZML cache
+SOFT_TTL_SEC = 20 * 60       # Older than this: serve immediately, refresh in the background
+HARD_TTL_SEC = 60 * 60       # Older than this: wait (bounded) for the refresh before serving
+WORKER_TIMEOUT_SEC = 120     # gunicorn --timeout in the Procfile (single sync worker); keep in sync
+HARD_TTL_WAIT_SEC = WORKER_TIMEOUT_SEC // 2  # Request-thread wait stays well inside the worker timeout
+REFRESH_CHECK_SEC = 5 * 60   # Timer poll that keeps the cache warm without request traffic
+REFRESH_FAILURE_COOLDOWN_SEC = REFRESH_CHECK_SEC  # Requests don't retry a failed refresh sooner than this
+
+# In-memory copy of the latest CZML (serialized + brotli bytes, ETag), swapped atomically
+_czml_cache = None
+
+def set_czml_cache(czml_bytes, mtime=None):
+    """Publishes freshly serialized CZML bytes to the request handlers."""
+    global _czml_cache
+    _czml_cache = {
+        'bytes': czml_bytes,
+        # Compressed once per refresh rather than once per request
+        'br_bytes': brotli.compress(czml_bytes, quality=5),
+        'etag': hashlib.sha1(czml_bytes).hexdigest(),
+        'mtime': mtime if mtime is not None else time.time()
+    }
+
+def load_cache_file():
+    """Warms the in-memory cache from the last run's file so restarts serve data immediately."""
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, 'rb') as f:
+            set_czml_cache(f.read(), mtime=os.path.getmtime(CACHE_FILE))
+
+def cache_age():
+    """Seconds since the in-memory CZML was generated (infinite if there is none yet)."""
+    cache = _czml_cache
+    return time.time() - cache['mtime'] if cache is not None else float('inf')
+
+def refresh_czml_cache():
+    """Runs the heavy simulation and swaps the result into the disk and memory caches."""
+    global _last_refresh_failure
+    try:
+        print("[SERVER] Running simulation update...")
+        data = main.get_czml()
+        czml_bytes = main.serialize_czml(data)
+        
+        # Write to disk atomically (write to temp then rename) to prevent read errors
+        temp_file = CACHE_FILE + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(czml_bytes)
+        os.replace(temp_file, CACHE_FILE)
+        set_czml_cache(czml_bytes)
+        
+        print("[SERVER] Simulation cache updated successfully.")
+    except Exception as e:
+        _last_refresh_failure = time.time()
+        print(f"[SERVER] Error in simulation loop: {e}")
+    finally:
+        _refresh_in_flight.clear()
+
+# In-flight flag: concurrent triggers coalesce into one (daemon) refresh thread
+_refresh_in_flight = threading.Event()
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+_last_refresh_failure = 0.0
+
+def refresh_cooling_down():
+    """True shortly after a failed refresh, so request traffic doesn't retry it back-to-back."""
+    return time.time() - _last_refresh_failure < REFRESH_FAILURE_COOLDOWN_SEC
+
+def trigger_refresh():
+    """Starts a background refresh unless one is already running; returns its thread."""
+    global _refresh_thread
+    with _refresh_lock:
+        if not _refresh_in_flight.is_set():
+            _refresh_in_flight.set()
+            _refresh_thread = threading.Thread(target=refresh_czml_cache, name="SimulationRefresh", daemon=True)
+            _refresh_thread.start()
+        return _refresh_thread
+
 def simulation_loop():
-    """Background thread that updates the simulation data every 30 minutes."""
+    """Background timer that refreshes the cache once it passes the soft TTL."""
     print("[SERVER] Starting Background Simulation Loop...")
     while True:
-        try:
-            print("[SERVER] Running simulation update...")
-            # Run the heavy simulation
-            data = main.get_czml()
-            
-            # Write to disk atomically (write to temp then rename) to prevent read errors
-            temp_file = CACHE_FILE + '.tmp'
-            with open(temp_file, 'w') as f:
-                json.dump(data, f)
-            os.replace(temp_file, CACHE_FILE)
-            
-            print("[SERVER] Simulation cache updated successfully.")
-        except Exception as e:
-            print(f"[SERVER] Error in simulation loop: {e}")
-        
-        # Sleep for 30 minutes before next update
-        time.sleep(1800)
+        if cache_age() > SOFT_TTL_SEC:
+            trigger_refresh()
+        time.sleep(REFRESH_CHECK_SEC)
+
+# Set exactly once, so repeated imports never spawn a second simulation thread
+_sim_started = False
+_sim_lock = threading.Lock()
 
 def start_background_thread():
-    # Check if a thread is already running to avoid duplicates in some environments
-    # (Simple check, mainly for local dev reloads)
-    for thread in threading.enumerate():
-        if thread.name == "SimulationThread":
+    global _sim_started
+    with _sim_lock:
+        if _sim_started:
             return
+        _sim_started = True
 
     thread = threading.Thread(target=simulation_loop, name="SimulationThread", daemon=True)
     thread.start()
 
-# Start the background thread immediately when app loads
+# Serve the previous run's data (if any) and start the background thread immediately when app loads
+load_cache_file()
 start_background_thread()
 
+# Text assets worth compressing; images are already compressed and keep streaming from disk
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js'}
+
+def send_static(filename):
+    """send_from_directory, but lets Flask-Compress gzip/brotli text assets."""
+    response = send_from_directory('.', filename)
+    # Flask-Compress skips direct_passthrough responses and never gzips streamed
+    # ones, so buffer small text files into memory to get gzip for every client
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        response.direct_passthrough = False
+        response.get_data()
+    return response
+
 @app.route('/')
 def index():
     """Serves the main visualization page."""
-    return send_from_directory('.', 'index.html')
+    return send_static('index.html')
 
 @app.route('/output.czml')
 def get_czml():
     """Serves the cached CZML data instantly."""
-    if os.path.exists(CACHE_FILE):
-        # Serve the cached file directly
-        with open(CACHE_FILE, 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
+    age = cache_age()
+    # Right after a failed refresh, requests just serve what we have (the timer retries)
+    if not refresh_cooling_down():
+        if age > HARD_TTL_SEC and _czml_cache is not None:
+            # Too old to serve as-is: give the refresh a bounded chance to finish first
+            trigger_refresh().join(timeout=HARD_TTL_WAIT_SEC)
+        elif age > SOFT_TTL_SEC:
+            # Stale-while-revalidate: answer with what we have, refresh in the background
+            trigger_refresh()
+
+    cache = _czml_cache
+    if cache is not None:
+        # Serve the pre-serialized bytes directly (no disk read, no re-encode)
+        if request.accept_encodings['br'] > 0:
+            response = Response(cache['br_bytes'], mimetype='application/json')
+            response.headers['Content-Encoding'] = 'br'
+            response.set_etag(cache['etag'] + '-br')
+        else:
+            # Flask-Compress gzips this path for clients without brotli support
+            response = Response(cache['bytes'], mimetype='application/json')
+            response.set_etag(cache['etag'])
+        response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
     else:
         # If simulation hasn't finished the first run yet
         return jsonify({
@@ -73,10 +173,13 @@ def serve_static(filename):
     ext = os.path.splitext(filename)[1].lower()
     
     if ext in allowed_extensions:
-        return send_from_directory('.', filename)
+        return send_static(filename)
     return "Forbidden", 403
 
 if __name__ == "__main__":
     print("Starting Sentinel Orbital Defense Server...")
     print("Access at http://localhost:8080")
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    # Debug mode (interactive debugger middleware) only on request via FLASK_DEBUG=1.
+    # The reloader would re-import this module in a child process and start a second simulation thread.
+    # For production use serve.py (waitress) or the Procfile (gunicorn).
+    app.run(host='0.0.0.0', port=8080, debug=os.environ.get('FLASK_DEBUG') == '1', use_reloader=False)
\ No newline at end of file
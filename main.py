@@ -1,8 +1,17 @@
 from skyfield.api import load, wgs84
 from skyfield.sgp4lib import EarthSatellite
+from sgp4.api import SatrecArray, jday
+from sgp4.exporter import export_tle
+import os
+import glob
+import hashlib
+import pickle
+import urllib.request
 import numpy as np
+from numba import njit
+from scipy.spatial import cKDTree
 import random
-import json
+import orjson
 from astropy import units as u
 from astropy.time import Time
 from poliastro.bodies import Earth
@@ -13,8 +22,19 @@ from poliastro.maneuver import Maneuver
 SCENARIO_NAME = "SENTINEL: DEEP SPACE MONITOR"
 DURATION_HOURS = 24
 STEP_MINUTES = 5  # Increased step size for performance
+DEBRIS_STEP_MINUTES = 15  # Background debris sample spacing (Cesium interpolates in between)
 COLLISION_THRESHOLD_KM = 200.0
 MANEUVER_LEAD_TIME_MIN = 45
+TLE_MAX_AGE_DAYS = 1.0  # Celestrak GP data refreshes at most daily
+TLE_DOWNLOAD_TIMEOUT_SEC = 10  # Per-socket-operation limit, so a stalled fetch can't hold up startup
+TLE_CACHE_PREFIX = 'tle_cache_'  # Parsed-TLE pickles: tle_cache_<source mtime hash>.pkl
+
+# --- TLE SOURCES (Celestrak GP group, gitignored download file, committed fallback) ---
+ACTIVE_GROUP = ('active', 'active.gp.tle', None)
+DEBRIS_GROUPS = [
+    ('iridium-33-debris', 'debris_iridium.gp.tle', 'debris_iridium.tle'),
+    ('cosmos-2251-debris', 'debris_cosmos.gp.tle', 'debris_cosmos.tle')
+]
 
 # --- ASSETS TO TRACK ---
 ASSETS = [
@@ -23,6 +43,25 @@ ASSETS = [
     {'name': 'SENTINEL-6', 'id': 'sentinel', 'catnr': '46984'}
 ]
 
+# Asset info-box HTML. Static fields are filled once in load_data(); only the
+# {status_html} slot changes between simulation runs.
+_ASSET_DESC_TMPL = """
+        <div style="font-family: 'Roboto Mono', monospace; font-size: 12px; text-align: left; color: #e0e0e0;">
+            <h3 style="margin: 0 0 5px 0; color: #00f2ff; border-bottom: 1px solid #00f2ff; padding-bottom: 3px;">{name}</h3>
+            <table style="width: 100%; border-collapse: collapse; margin-bottom: 10px;">
+                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">NORAD ID</td><td style="text-align: right;">{catnr}</td></tr>
+                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">INCLINATION</td><td style="text-align: right;">{inclination:.2f}°</td></tr>
+                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">PERIOD</td><td style="text-align: right;">{period:.2f} min</td></tr>
+                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">ECCENTRICITY</td><td style="text-align: right;">{ecc:.4f}</td></tr>
+            </table>
+            <div style="background: rgba(0, 20, 40, 0.5); padding: 5px; border: 1px solid #334455; text-align: center;">
+                STATUS: {{status_html}}
+            </div>
+        </div>
+        """
+_STATUS_MANEUVER_HTML = '<span style="color:#ff3333; font-weight:bold;">⚠ EVASIVE MANEUVER</span>'
+_STATUS_NOMINAL_HTML = '<span style="color:#00ff66; font-weight:bold;">NOMINAL OPERATION</span>'
+
 # Global cache for loaded data
 _data_cache = {
     'fleet': None,
@@ -30,8 +69,112 @@ _data_cache = {
     'ts': None
 }
 
-def get_url(catnr):
-    return f'https://celestrak.org/NORAD/elements/gp.php?CATNR={catnr}&FORMAT=tle'
+def get_group_url(group):
+    return f'https://celestrak.org/NORAD/elements/gp.php?GROUP={group}&FORMAT=tle'
+
+def refresh_tle_group(group, filename):
+    """Re-downloads a Celestrak GP group into its (gitignored) file once it is stale.
+
+    The download only replaces the file (atomically) if it parses to at least one
+    TLE, so an error page can never shadow the previous download or the fallback.
+    """
+    if load.exists(filename) and load.days_old(filename) < TLE_MAX_AGE_DAYS:
+        return
+    temp_file = filename + '.tmp'
+    try:
+        with urllib.request.urlopen(get_group_url(group), timeout=TLE_DOWNLOAD_TIMEOUT_SEC) as response:
+            body = response.read()
+        with open(temp_file, 'wb') as f:
+            f.write(body)
+        if not load.tle_file(temp_file):
+            raise ValueError("response contained no TLEs")
+        os.replace(temp_file, filename)
+    except Exception as e:
+        print(f"    ! Could not refresh {filename} ({e}).")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def tle_group_source(filename, fallback=None):
+    """Newest local copy of a group: its download if present, else the committed fallback."""
+    for local_file in (filename, fallback):
+        if local_file and load.exists(local_file):
+            return local_file
+    return None
+
+def tle_source_files():
+    """Every local TLE file the fleet and debris are parsed from."""
+    groups = [ACTIVE_GROUP] + DEBRIS_GROUPS
+    files = [tle_group_source(filename, fallback) for _, filename, fallback in groups]
+    files += [f"{asset['id']}.tle" for asset in ASSETS]
+    return [f for f in files if f and os.path.exists(f)]
+
+def tle_cache_key():
+    """Hash of the TLE source file names and mtimes."""
+    stamps = [(f, os.path.getmtime(f)) for f in tle_source_files()]
+    return hashlib.sha1(repr(stamps).encode()).hexdigest()[:16]
+
+def read_tle_cache(key, ts):
+    """Rebuilds the cached satellite selection from its pickled TLE lines, or returns None on a miss."""
+    path = f"{TLE_CACHE_PREFIX}{key}.pkl"
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        asset_sats = {aid: EarthSatellite(line1, line2, name, ts) for aid, (name, line1, line2) in payload['assets'].items()}
+        debris = [EarthSatellite(line1, line2, name, ts) for name, line1, line2 in payload['debris']]
+        return asset_sats, debris
+    except Exception as e:
+        print(f"    ! Ignoring unreadable TLE cache {path}: {e}")
+        return None
+
+def write_tle_cache(key, asset_sats, debris):
+    """Pickles the selected satellites, replacing any cache built from older TLE files."""
+    # Satrec objects do not pickle, so the selection is stored as (name, line1, line2)
+    payload = {
+        'assets': {aid: (sat.name, *export_tle(sat.model)) for aid, sat in asset_sats.items()},
+        'debris': [(sat.name, *export_tle(sat.model)) for sat in debris]
+    }
+    try:
+        for old_path in glob.glob(f"{TLE_CACHE_PREFIX}*.pkl"):
+            os.remove(old_path)
+        temp_file = f"{TLE_CACHE_PREFIX}{key}.pkl.tmp"
+        with open(temp_file, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, f"{TLE_CACHE_PREFIX}{key}.pkl")
+    except OSError as e:
+        print(f"    ! Could not write TLE cache: {e}")
+
+def parse_tle_sources():
+    """Parses fleet and debris TLEs. Returns ({asset id: satellite}, [debris satellites])."""
+    # OPTIMIZATION: One batched download of the active catalogue serves every asset,
+    # instead of one Celestrak round-trip per asset.
+    active_file = tle_group_source(ACTIVE_GROUP[1])
+    if active_file:
+        active = {sat.model.satnum: sat for sat in load.tle_file(active_file)}
+    else:
+        print("    ! Active catalogue unavailable, using per-asset TLE files.")
+        active = {}
+
+    asset_sats = {}
+    for asset in ASSETS:
+        try:
+            sat = active.get(int(asset['catnr']))
+            if sat is None:
+                sat = load.tle_file(f"{asset['id']}.tle")[0]
+            asset_sats[asset['id']] = sat
+        except Exception as e:
+            print(f"    ! Failed to load {asset['name']}: {e}")
+
+    try:
+        debris = []
+        for _, filename, fallback in DEBRIS_GROUPS:
+            debris += load.tle_file(tle_group_source(filename, fallback))
+    except Exception as e:
+        print("    ! Using synthetic debris fallback.")
+        debris = []
+
+    return asset_sats, debris
 
 def load_data():
     """Loads TLE data once and caches it."""
@@ -40,30 +183,42 @@ def load_data():
 
     print("[SYSTEM] Initializing Orbital Dynamics Engine...")
     ts = load.timescale()
+
+    # Stale Celestrak downloads are refreshed first, so the TLE cache key below
+    # sees the final source file mtimes (a failed download leaves them unchanged).
+    for group, filename, _ in [ACTIVE_GROUP] + DEBRIS_GROUPS:
+        refresh_tle_group(group, filename)
+
+    # OPTIMIZATION: Warm restarts rebuild just the selected satellites from their
+    # pickled TLE lines (one twoline2rv each) instead of reading every TLE file and
+    # scanning the full active catalogue, as long as no source file has changed.
+    parsed = read_tle_cache(tle_cache_key(), ts)
+    if parsed is None:
+        parsed = parse_tle_sources()
+        write_tle_cache(tle_cache_key(), *parsed)
+    asset_sats, all_debris = parsed
     
     print("  - Loading Fleet Ephemeris...")
     fleet = []
     for asset in ASSETS:
-        try:
-            try:
-                sat = load.tle_file(f"{asset['id']}.tle")[0]
-            except:
-                sat = load.tle_file(get_url(asset['catnr']), filename=f"{asset['id']}.tle")[0]
-            fleet.append({'data': asset, 'sat': sat})
-        except Exception as e:
-            print(f"    ! Failed to load {asset['name']}: {e}")
+        sat = asset_sats.get(asset['id'])
+        if sat is None:
+            continue
+        # Calculate Orbital Elements for Display
+        static_desc = _ASSET_DESC_TMPL.format(
+            name=asset['name'],
+            catnr=asset['catnr'],
+            inclination=sat.model.inclo * 180.0 / np.pi,
+            period=2 * np.pi / sat.model.no_kozai,
+            ecc=sat.model.ecco
+        )
+        fleet.append({'data': asset, 'sat': sat, 'description': static_desc})
 
     print("  - Loading Debris Fields...")
-    try:
-        debris_iridium = load.tle_file('debris_iridium.tle')
-        debris_cosmos = load.tle_file('debris_cosmos.tle')
-        real_debris = debris_iridium + debris_cosmos
-        # OPTIMIZATION: Limit debris to 500 for free tier CPU limits
-        if len(real_debris) > 500:
-            real_debris = random.sample(real_debris, 500)
-    except Exception as e:
-        print("    ! Using synthetic debris fallback.")
-        real_debris = []
+    real_debris = all_debris
+    # OPTIMIZATION: Limit debris to 500 for free tier CPU limits
+    if len(real_debris) > 500:
+        real_debris = random.sample(real_debris, 500)
     
     _data_cache['ts'] = ts
     _data_cache['fleet'] = fleet
@@ -71,6 +226,163 @@ def load_data():
     
     return ts, fleet, real_debris
 
+def propagate_teme(satellites, jd, fr):
+    """Propagates all satellites at all times in one SGP4 batch.
+
+    Returns TEME positions in km with shape (satellites, times, 3).
+    Failed propagations (e.g. decayed objects) come back as NaN.
+    """
+    if not satellites:
+        return np.empty((0, len(jd), 3))
+
+    sat_array = SatrecArray([sat.model for sat in satellites])
+    _, r, _ = sat_array.sgp4(jd, fr)
+    return r
+
+def find_collision_risks(r_assets, r_debris, threshold_km):
+    """Finds the first close approach for each asset.
+
+    Positions are (objects, times, 3) arrays in km. Returns one entry per asset,
+    either None or (time_index, debris_index, distance_km) for the earliest
+    time step with debris inside the threshold (lowest debris index on ties).
+    """
+    risks = [None] * len(r_assets)
+    threshold2 = threshold_km ** 2
+    # Decayed objects propagate to NaN and are left out of the search
+    finite_assets = np.isfinite(r_assets).all(axis=2)
+    finite_debris = np.isfinite(r_debris).all(axis=2)
+
+    for t_idx in range(r_assets.shape[1]):
+        unresolved = [a for a in range(len(r_assets)) if risks[a] is None]
+        if not unresolved:
+            break
+        pending = [a for a in unresolved if finite_assets[a, t_idx]]
+        valid_idx = np.flatnonzero(finite_debris[:, t_idx])
+        if not pending or len(valid_idx) == 0:
+            continue
+
+        # OPTIMIZATION: KD-tree broadphase queried for all pending assets in one call,
+        # then an exact squared-distance check (no sqrt) on the few candidates.
+        tree = cKDTree(r_debris[valid_idx, t_idx])
+        candidate_lists = tree.query_ball_point(r_assets[pending, t_idx], r=threshold_km)
+
+        for a_idx, candidates in zip(pending, candidate_lists):
+            if not candidates:
+                continue
+            cand_idx = valid_idx[np.sort(candidates)]
+            delta = r_debris[cand_idx, t_idx] - r_assets[a_idx, t_idx]
+            d2 = np.einsum('ij,ij->i', delta, delta)
+            hits = np.flatnonzero(d2 < threshold2)
+            if len(hits):
+                risks[a_idx] = (t_idx, int(cand_idx[hits[0]]), float(np.sqrt(d2[hits[0]])))
+    return risks
+
+def kepler_positions(a, ecc, inc, raan, argp, nu0, mu, dts):
+    """Propagates an elliptic orbit over many time offsets at once.
+
+    Elements are plain floats (km, rad), mu in km^3/s^2 and dts an array of
+    seconds since the element epoch. Returns positions in km, shape (len(dts), 3).
+    """
+    n = np.sqrt(mu / a**3)
+    E0 = 2 * np.arctan(np.sqrt((1 - ecc) / (1 + ecc)) * np.tan(nu0 / 2))
+    M = (E0 - ecc * np.sin(E0)) + n * np.asarray(dts, dtype=float)
+
+    # Newton-Raphson on Kepler's equation E - e*sin(E) = M, whole array at once
+    E = M + ecc * np.sin(M)
+    for _ in range(8):
+        E -= (E - ecc * np.sin(E) - M) / (1 - ecc * np.cos(E))
+
+    # Perifocal (PQW) positions, then rotate into the inertial frame
+    pqw = np.column_stack([
+        a * (np.cos(E) - ecc),
+        a * np.sqrt(1 - ecc**2) * np.sin(E),
+        np.zeros_like(E)
+    ])
+    cO, sO = np.cos(raan), np.sin(raan)
+    ci, si = np.cos(inc), np.sin(inc)
+    cw, sw = np.cos(argp), np.sin(argp)
+    rot = np.array([
+        [cO*cw - sO*sw*ci, -cO*sw - sO*cw*ci, sO*si],
+        [sO*cw + cO*sw*ci, -sO*sw + cO*cw*ci, -cO*si],
+        [sw*si, cw*si, ci]
+    ])
+    return np.einsum('ij,nj->ni', rot, pqw)
+
+@njit(cache=True, fastmath=True)
+def kepler_propagate(r0, v0, mu, dts):
+    """Propagates an elliptic two-body state (km, km/s) to many time offsets (s).
+
+    Uses Lagrange f/g coefficients with a Newton-Raphson solve for the change in
+    eccentric anomaly. Returns positions in km, shape (len(dts), 3).
+    """
+    r0n = np.sqrt(r0[0]**2 + r0[1]**2 + r0[2]**2)
+    v0n2 = v0[0]**2 + v0[1]**2 + v0[2]**2
+    a = 1.0 / (2.0 / r0n - v0n2 / mu)
+    n = np.sqrt(mu / a**3)
+    sigma0 = (r0[0]*v0[0] + r0[1]*v0[1] + r0[2]*v0[2]) / np.sqrt(mu)
+    k1 = 1.0 - r0n / a
+    k2 = sigma0 / np.sqrt(a)
+
+    out = np.empty((dts.shape[0], 3))
+    for i in range(dts.shape[0]):
+        M = n * dts[i]
+        dE = M
+        for _ in range(8):
+            f = dE - k1 * np.sin(dE) + k2 * (1.0 - np.cos(dE)) - M
+            df = 1.0 - k1 * np.cos(dE) + k2 * np.sin(dE)
+            dE -= f / df
+        f_coef = 1.0 - a / r0n * (1.0 - np.cos(dE))
+        g_coef = dts[i] - (dE - np.sin(dE)) / n
+        for j in range(3):
+            out[i, j] = f_coef * r0[j] + g_coef * v0[j]
+    return out
+
+def pack_cartesian_tracks(tracks):
+    """Packs (seconds, positions_km) tracks into one contiguous float64 buffer.
+
+    Returns one flat CZML [t, x, y, z, ...] view (metres) per track, in order.
+    All views share the single allocation, so no per-track arrays are created.
+    """
+    lengths = [len(seconds) for seconds, _ in tracks]
+    buffer = np.empty((sum(lengths), 4), dtype=np.float64)
+    views = []
+    start = 0
+    for (seconds, positions_km), n in zip(tracks, lengths):
+        block = buffer[start:start + n]
+        block[:, 0] = seconds
+        block[:, 1:4] = positions_km
+        views.append(block.reshape(-1))
+        start += n
+    buffer[:, 1:4] *= 1000.0
+    return views
+
+def serialize_czml(czml):
+    """Serializes the CZML document to JSON bytes; ndarrays are encoded directly from C."""
+    return orjson.dumps(czml, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def build_static_debris_czml(count=800, seed=42):
+    """Builds the decorative background debris shell (random points 400-1400 km up)."""
+    rng = np.random.default_rng(seed)
+    u_vecs = rng.normal(size=(count, 3))
+    u_vecs /= np.linalg.norm(u_vecs, axis=1, keepdims=True)
+    dists = 6371 + 400 + rng.random(count) * 1000
+    positions = u_vecs * (dists * 1000)[:, None]
+
+    return [{
+        "id": f"static_deb_{i}",
+        "name": "Background Debris",
+        "position": {"cartesian": pos},
+        "point": {
+            "show": True,
+            "pixelSize": 2,
+            "color": {"rgba": [100, 100, 100, 80]}
+        }
+    } for i, pos in enumerate(positions.tolist())]
+
+# OPTIMIZATION: Generated once per process with a fixed seed, so every refresh reuses
+# the same entries (and the field no longer jumps around between refreshes).
+_STATIC_DEBRIS_CZML = build_static_debris_czml()
+
 def get_czml():
     """Runs the simulation and returns the CZML structure."""
     ts, static_fleet, real_debris = load_data()
@@ -82,6 +394,7 @@ def get_czml():
         fleet.append({
             'data': item['data'], 
             'sat': item['sat'], 
+            'description': item['description'],
             'maneuver': None, 
             'collisions': []
         })
@@ -89,34 +402,34 @@ def get_czml():
     # --- SIMULATION SETUP ---
     start_time = ts.now()
     steps = int(DURATION_HOURS * 60 / STEP_MINUTES)
-    times = [start_time + (i * STEP_MINUTES / 1440.0) for i in range(steps)]
+    # OPTIMIZATION: One shared Time array for the whole window. All positions come
+    # straight from SGP4 in TEME, so no precession/nutation is ever evaluated.
+    times = ts.tt_jd(start_time.tt + np.arange(steps) * STEP_MINUTES / 1440.0)
 
     # --- COLLISION DETECTION & MANEUVER PLANNING ---
     print(f"[SYSTEM] Running Propagations ({DURATION_HOURS}h window)...")
 
     threat_debris_ids = set()
 
-    for asset_obj in fleet:
+    # OPTIMIZATION: Propagate every asset and debris object over the whole window in
+    # one vectorized SGP4 call each, then compare distances in TEME (no GCRS transform).
+    jd, fr = jday(*times.utc)
+    r_assets = propagate_teme([a['sat'] for a in fleet], jd, fr)
+    r_debris = propagate_teme(real_debris, jd, fr)
+
+    risks = find_collision_risks(r_assets, r_debris, COLLISION_THRESHOLD_KM)
+
+    for a_idx, asset_obj in enumerate(fleet):
         sat = asset_obj['sat']
         name = asset_obj['data']['name']
         
         detected_risk = None
         
-        # OPTIMIZATION: Check fewer time steps for collisions (every 10th step instead of 5th)
-        for t_idx in range(0, len(times), 10):
-            t = times[t_idx]
-            my_pos = sat.at(t).position.km
-            
-            for deb in real_debris:
-                deb_pos = deb.at(t).position.km
-                dist = np.linalg.norm(my_pos - deb_pos)
-                
-                if dist < COLLISION_THRESHOLD_KM:
-                    detected_risk = {'time': t, 'debris': deb, 'dist': dist}
-                    threat_debris_ids.add(deb.model.satnum)
-                    break
-            if detected_risk:
-                break
+        if risks[a_idx]:
+            t_idx, d_idx, dist = risks[a_idx]
+            deb = real_debris[d_idx]
+            detected_risk = {'time': times[t_idx], 'debris': deb, 'dist': dist}
+            threat_debris_ids.add(deb.model.satnum)
         
         if detected_risk:
             print(f"  ! ALERT: {name} collision risk with {detected_risk['debris'].name} ({detected_risk['dist']:.1f}km)")
@@ -124,8 +437,9 @@ def get_czml():
             burn_time = detected_risk['time'] - (MANEUVER_LEAD_TIME_MIN / 1440.0)
             if burn_time < start_time: burn_time = start_time
             
-            pos_vec = sat.at(burn_time).position.km * u.km
-            vel_vec = sat.at(burn_time).velocity.km_per_s * u.km / u.s
+            _, r_burn, v_burn = sat.model.sgp4(*jday(*burn_time.utc))
+            pos_vec = np.array(r_burn) * u.km
+            vel_vec = np.array(v_burn) * u.km / u.s
             
             epoch_astropy = Time(burn_time.utc_datetime())
             orbit_initial = Orbit.from_vectors(Earth, pos_vec, vel_vec, epoch=epoch_astropy)
@@ -140,6 +454,7 @@ def get_czml():
             asset_obj['maneuver'] = {
                 'time': burn_time,
                 'orbit_new': orbit_new,
+                'r_burn': np.array(r_burn),
                 'risk': detected_risk,
                 'type': 'PROGRADE AVOIDANCE'
             }
@@ -147,13 +462,22 @@ def get_czml():
     # --- CZML GENERATION ---
     print("[SYSTEM] Generating Telemetry (CZML)...")
 
+    # OPTIMIZATION: Window invariants formatted/computed once, shared by every entity
+    epoch = times[0]
+    seconds_arr = (times - epoch) * 86400.0
+    t0_iso = times[0].utc_iso()
+    tN_iso = times[-1].utc_iso()
+    availability = f"{t0_iso}/{tN_iso}"
+    # Sampled tracks as (CZML position dict, seconds, positions_km), packed at the end
+    tracks = []
+
     czml = [{
         "id": "document",
         "name": SCENARIO_NAME,
         "version": "1.0",
         "clock": {
-            "interval": f"{times[0].utc_iso()}/{times[-1].utc_iso()}",
-            "currentTime": times[0].utc_iso(),
+            "interval": availability,
+            "currentTime": t0_iso,
             "multiplier": 60, 
             "range": "LOOP_STOP",
             "step": "SYSTEM_CLOCK_MULTIPLIER"
@@ -165,58 +489,35 @@ def get_czml():
         "position": {"cartesian": [0.0, 0.0, 0.0]}
     }]
 
-    epoch = times[0]
-
     # 1. Render Assets (With Composite Model)
-    for asset in fleet:
+    for a_idx, asset in enumerate(fleet):
         sat = asset['sat']
         maneuver = asset['maneuver']
         
-        # Calculate Orbital Elements for Display
-        inclination_deg = sat.model.inclo * 180.0 / np.pi
-        period_min = 2 * np.pi / sat.model.no_kozai
-        eccentricity = sat.model.ecco
+        status_html = _STATUS_MANEUVER_HTML if maneuver else _STATUS_NOMINAL_HTML
+        description = asset['description'].replace('{status_html}', status_html)
         
-        status_html = '<span style="color:#ff3333; font-weight:bold;">⚠ EVASIVE MANEUVER</span>' if maneuver else '<span style="color:#00ff66; font-weight:bold;">NOMINAL OPERATION</span>'
+        positions_orig = r_assets[a_idx]
+        positions_active = positions_orig.copy()
         
-        description = f"""
-        <div style="font-family: 'Roboto Mono', monospace; font-size: 12px; text-align: left; color: #e0e0e0;">
-            <h3 style="margin: 0 0 5px 0; color: #00f2ff; border-bottom: 1px solid #00f2ff; padding-bottom: 3px;">{asset['data']['name']}</h3>
-            <table style="width: 100%; border-collapse: collapse; margin-bottom: 10px;">
-                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">NORAD ID</td><td style="text-align: right;">{asset['data']['catnr']}</td></tr>
-                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">INCLINATION</td><td style="text-align: right;">{inclination_deg:.2f}°</td></tr>
-                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">PERIOD</td><td style="text-align: right;">{period_min:.2f} min</td></tr>
-                <tr style="border-bottom: 1px solid #334455;"><td style="color: #88aaff; padding: 2px;">ECCENTRICITY</td><td style="text-align: right;">{eccentricity:.4f}</td></tr>
-            </table>
-            <div style="background: rgba(0, 20, 40, 0.5); padding: 5px; border: 1px solid #334455; text-align: center;">
-                STATUS: {status_html}
-            </div>
-        </div>
-        """
-        
-        cartesian_active = []
-        cartesian_ghost = []
-        
-        for t in times:
-            seconds = (t - epoch) * 86400.0
-            
-            pos_orig = sat.at(t).position.km
-            cartesian_ghost.extend([seconds, pos_orig[0]*1000, pos_orig[1]*1000, pos_orig[2]*1000])
-            
-            if maneuver and t.tt >= maneuver['time'].tt:
-                dt_sec = (t - maneuver['time']) * 86400.0
-                current_state = maneuver['orbit_new'].propagate(dt_sec * u.s)
-                pos_safe = current_state.r.to(u.km).value
-                cartesian_active.extend([seconds, pos_safe[0]*1000, pos_safe[1]*1000, pos_safe[2]*1000])
-            else:
-                cartesian_active.extend([seconds, pos_orig[0]*1000, pos_orig[1]*1000, pos_orig[2]*1000])
+        if maneuver:
+            # Post-burn samples follow the new orbit, all propagated in one compiled call
+            post_burn = times.tt >= maneuver['time'].tt
+            burn_offset = (maneuver['time'] - epoch) * 86400.0
+            orbit_new = maneuver['orbit_new']
+            positions_active[post_burn] = kepler_propagate(
+                orbit_new.r.to(u.km).value,
+                orbit_new.v.to(u.km / u.s).value,
+                Earth.k.to(u.km**3 / u.s**2).value,
+                seconds_arr[post_burn] - burn_offset
+            )
 
         # PART A: The BUS (Box Body)
         czml.append({
             "id": f"{asset['data']['id']}_active",
             "name": asset['data']['name'],
             "description": description,
-            "availability": f"{times[0].utc_iso()}/{times[-1].utc_iso()}",
+            "availability": availability,
             "box": {
                 # Gold Box Body
                 "dimensions": {"cartesian": [30000.0, 30000.0, 50000.0]}, # Even larger size for visibility
@@ -244,17 +545,18 @@ def get_czml():
             "position": {
                 "interpolationAlgorithm": "LAGRANGE",
                 "interpolationDegree": 5,
-                "referenceFrame": "FIXED",
-                "epoch": times[0].utc_iso(),
-                "cartesian": cartesian_active
+                "referenceFrame": "INERTIAL",
+                "epoch": t0_iso,
+                "cartesian": []
             }
         })
+        tracks.append((czml[-1]["position"], seconds_arr, positions_active))
 
         # PART B: The PANELS (Blue Wings attached to same position)
         czml.append({
             "id": f"{asset['data']['id']}_panels",
             "name": "Solar Arrays",
-            "availability": f"{times[0].utc_iso()}/{times[-1].utc_iso()}",
+            "availability": availability,
             "box": {
                 # Wide Blue Panels
                 "dimensions": {"cartesian": [60000.0, 6000.0, 200.0]}, 
@@ -270,7 +572,7 @@ def get_czml():
             czml.append({
                 "id": f"{asset['data']['id']}_ghost",
                 "name": f"{asset['data']['name']} (Predicted Impact)",
-                "availability": f"{maneuver['time'].utc_iso()}/{times[-1].utc_iso()}",
+                "availability": f"{maneuver['time'].utc_iso()}/{tN_iso}",
                 "path": {
                     "show": True,
                     "width": 1,
@@ -283,16 +585,18 @@ def get_czml():
                     "resolution": 120
                 },
                 "position": {
-                    "epoch": times[0].utc_iso(),
-                    "cartesian": cartesian_ghost
+                    "referenceFrame": "INERTIAL",
+                    "epoch": t0_iso,
+                    "cartesian": []
                 }
             })
+            tracks.append((czml[-1]["position"], seconds_arr, positions_orig))
             
-            pos_burn = sat.at(maneuver['time']).position.km * 1000
+            pos_burn = maneuver['r_burn'] * 1000
             czml.append({
                 "id": f"{asset['data']['id']}_burn",
                 "name": "Auto-Maneuver Event",
-                "position": {"cartesian": [pos_burn[0], pos_burn[1], pos_burn[2]]},
+                "position": {"referenceFrame": "INERTIAL", "cartesian": [pos_burn[0], pos_burn[1], pos_burn[2]]},
                 "point": {
                     "pixelSize": 15,
                     "color": {"rgba": [255, 200, 0, 255]},
@@ -322,18 +626,24 @@ def get_czml():
         epoch=Time(start_time.utc_datetime())
     )
 
-    asteroid_cart = []
-    for t in times:
-        dt_sec = (t - epoch) * 86400.0
-        state = apophis_orbit.propagate(dt_sec * u.s)
-        pos = state.r.to(u.km).value
-        asteroid_cart.extend([dt_sec, pos[0]*1000, pos[1]*1000, pos[2]*1000])
+    # OPTIMIZATION: Solve Kepler's equation for every time step in one vectorized pass
+    # instead of calling poliastro's propagate() per step.
+    asteroid_positions = kepler_positions(
+        apophis_orbit.a.to(u.km).value,
+        apophis_orbit.ecc.value,
+        apophis_orbit.inc.to(u.rad).value,
+        apophis_orbit.raan.to(u.rad).value,
+        apophis_orbit.argp.to(u.rad).value,
+        apophis_orbit.nu.to(u.rad).value,
+        Earth.k.to(u.km**3 / u.s**2).value,
+        seconds_arr
+    )
 
     czml.append({
         "id": "apophis_99942",
         "name": "99942 APOPHIS (PHA)",
         "description": "Potentially Hazardous Asteroid<br>Class: Aten",
-        "availability": f"{times[0].utc_iso()}/{times[-1].utc_iso()}",
+        "availability": availability,
         "point": {
             "show": True,
             "pixelSize": 10,
@@ -357,15 +667,29 @@ def get_czml():
             "trailTime": 100000 # Long trail
         },
         "position": {
-            "epoch": times[0].utc_iso(),
-            "cartesian": asteroid_cart
+            "referenceFrame": "INERTIAL",
+            "epoch": t0_iso,
+            "cartesian": []
         }
     })
+    tracks.append((czml[-1]["position"], seconds_arr, asteroid_positions))
 
     # 2. Render Real Debris (High Visibility)
-    for deb in real_debris:
+    # OPTIMIZATION: Non-threat debris is decimated and smoothed client-side with Lagrange
+    # interpolation; threats keep the full sample rate.
+    step_stride = max(1, DEBRIS_STEP_MINUTES // STEP_MINUTES)
+
+    for d_idx, deb in enumerate(real_debris):
         is_threat = deb.model.satnum in threat_debris_ids
         
+        # Decayed objects propagate to NaN: drop those samples, and the object if none are left
+        stride = 1 if is_threat else step_stride
+        # Always keep the final step so decimated tracks cover the whole clock interval
+        sample_idx = np.unique(np.r_[np.arange(0, len(times), stride), len(times) - 1])
+        sample_idx = sample_idx[np.isfinite(r_debris[d_idx, sample_idx]).all(axis=1)]
+        if len(sample_idx) == 0:
+            continue
+        
         color = [255, 30, 30, 255] if is_threat else [180, 200, 220, 150]
         scale = 10 if is_threat else 4
         
@@ -380,42 +704,29 @@ def get_czml():
                 "outlineWidth": 1 if is_threat else 0
             },
             "position": {
-                "epoch": times[0].utc_iso(),
+                "interpolationAlgorithm": "LAGRANGE",
+                "interpolationDegree": 5,
+                "referenceFrame": "INERTIAL",
+                "epoch": t0_iso,
                 "cartesian": [] 
             }
         })
         
-        deb_cart = []
-        step_stride = 2 # Optimization: 5 -> 2 for smoother playback
-        for t_idx in range(0, len(times), step_stride): # Step 5
-            t = times[t_idx]
-            pos = deb.at(t).position.km
-            sec = (t - epoch) * 86400.0
-            deb_cart.extend([sec, pos[0]*1000, pos[1]*1000, pos[2]*1000])
-        czml[-1]["position"]["cartesian"] = deb_cart
+        tracks.append((czml[-1]["position"], seconds_arr[sample_idx], r_debris[d_idx, sample_idx]))
+
+    # OPTIMIZATION: Every sampled track lives in one contiguous float64 buffer; entities hold
+    # flat views into it, which orjson serializes directly.
+    packed = pack_cartesian_tracks([(seconds, positions) for _, seconds, positions in tracks])
+    for (position, _, _), samples in zip(tracks, packed):
+        position["cartesian"] = samples
 
     # 3. Background Static Debris (Density)
-    for i in range(800):
-        u_vec = np.random.normal(0, 1, 3)
-        u_vec /= np.linalg.norm(u_vec)
-        dist = 6371 + 400 + np.random.random() * 1000
-        pos = u_vec * dist * 1000
-        
-        czml.append({
-            "id": f"static_deb_{i}",
-            "name": "Background Debris",
-            "position": {"cartesian": [pos[0], pos[1], pos[2]]},
-            "point": {
-                "show": True,
-                "pixelSize": 2,
-                "color": {"rgba": [100, 100, 100, 80]}
-            }
-        })
+    czml.extend(_STATIC_DEBRIS_CZML)
         
     return czml
 
 if __name__ == "__main__":
     # Standalone execution mode
     data = get_czml()
-    with open('output.czml', 'w') as f:
-        json.dump(data, f)
+    with open('output.czml', 'wb') as f:
+        f.write(serialize_czml(data))
@@ -0,0 +1,10 @@
+from waitress import serve
+import os
+from app import app
+
+if __name__ == "__main__":
+    # Production entrypoint: multi-threaded WSGI server instead of Flask's dev server
+    port = int(os.environ.get('PORT', 8080))
+    print("Starting Sentinel Orbital Defense Server (waitress)...")
+    print(f"Access at http://localhost:{port}")
+    serve(app, host='0.0.0.0', port=port, threads=8)